@@ -0,0 +1,39 @@
+"""
+One-shot script to convert the Keras disease models to quantized TFLite.
+
+Run this offline after training/updating a model:
+
+    python convert_models_tflite.py
+
+It writes *_int8.tflite files next to the .keras models; app.py picks
+them up automatically on the next start and serves inference through
+tf.lite.Interpreter instead of the full FP32 Keras graph. Dynamic-range
+quantization is used so no representative dataset is required - weights
+are stored as INT8 while activations stay float.
+"""
+import os
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+MODELS = {
+    'static/models/arecanut_ayld_predictor_v2.keras': 'static/models/arecanut_ayld_predictor_v2_int8.tflite',
+    'static/models/arecanut_koleroga_predictor_v3.keras': 'static/models/arecanut_koleroga_predictor_v3_int8.tflite',
+}
+
+
+def convert(keras_path, tflite_path):
+    model = load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    tflite_model = converter.convert()
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"[SUCCESS] Wrote {tflite_path} ({len(tflite_model) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    for keras_path, tflite_path in MODELS.items():
+        if not os.path.exists(keras_path):
+            print(f"[WARNING] Skipping {keras_path} - file not found")
+            continue
+        convert(keras_path, tflite_path)
@@ -1,16 +1,58 @@
+import functools
+import json
+import time
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
+from flask_bcrypt import Bcrypt
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 
 db = SQLAlchemy()
+bcrypt = Bcrypt()
+
+# bcrypt cost tuned for ~100-250 ms per hash on current server CPUs
+BCRYPT_ROUNDS = 12
 
 # India Standard Time
 IST = ZoneInfo('Asia/Kolkata')
 
-def get_ist_now():
-    """Get current time in IST"""
-    return datetime.now(IST)
+# Column default: one bound call instead of a wrapper frame per insert
+get_ist_now = functools.partial(datetime.now, IST)
+
+class BulkInsertMixin:
+    """
+    Chunked SQLAlchemy Core insert for high-frequency or batch writes.
+    Skips per-instance ORM bookkeeping and lets the DBAPI use
+    executemany, which is an order of magnitude faster than add() per
+    row for sensor feeds and seed/import jobs.
+    """
+    BULK_CHUNK = 1000
+
+    @classmethod
+    def bulk_insert(cls, rows):
+        """Insert a list of column dicts in chunks and commit once."""
+        table = cls.__table__
+        for start in range(0, len(rows), cls.BULK_CHUNK):
+            db.session.execute(table.insert(), rows[start:start + cls.BULK_CHUNK])
+        db.session.commit()
+
+    @classmethod
+    @contextmanager
+    def ingest_batch(cls):
+        """
+        Buffer a run of session.add() calls into one transaction.
+        Ingestion loops that commit per row pay an fsync per row; inside
+        this block everything flushes and fsyncs once at exit, rolling
+        back as a unit on error.
+        """
+        try:
+            yield
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -21,27 +63,51 @@ class User(db.Model):
     name = db.Column(db.String(100), nullable=False)
     location = db.Column(db.String(200))
     farm_size = db.Column(db.String(50))
-    user_type = db.Column(db.String(20), nullable=False)  # 'Farmer' or 'Developer'
-    password_hash = db.Column(db.String(200), nullable=False)
+    user_type = db.Column(db.Enum('Farmer', 'Developer', name='user_type_enum'), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
+    # Pump state is 1:1 with the user, so it lives here rather than in
+    # a separate table that every control-panel render had to join
+    pump_status = db.Column(db.Enum('ON', 'OFF', name='pump_status_enum'), default='OFF')
+    pump_updated_at = db.Column(db.DateTime, default=get_ist_now)
     created_at = db.Column(db.DateTime, default=get_ist_now)
     
-    # Relationships
+    # Relationships. Nothing in the app reads these collections today -
+    # listings go through the list_summary column tuples - so neither
+    # may eager-load: disease_detections stays plain lazy (batch users
+    # with selectinload() at the call site if one appears), and
+    # irrigation_logs is a dynamic Query that call sites must order and
+    # limit rather than materializing every row.
     disease_detections = db.relationship('DiseaseDetection', backref='user', lazy=True)
-    irrigation_logs = db.relationship('IrrigationLog', backref='user', lazy=True)
+    irrigation_logs = db.relationship('IrrigationLog', backref='user', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-    
+        self.password_hash = bcrypt.generate_password_hash(password, rounds=BCRYPT_ROUNDS).decode()
+
+    def has_legacy_hash(self):
+        """
+        True if the stored hash predates the bcrypt switch. Werkzeug
+        writes method-prefixed hashes (pbkdf2: on older versions,
+        scrypt: since 2.3) while bcrypt strings always start with $2,
+        so anything without the $2 prefix is a legacy Werkzeug hash.
+        """
+        return not self.password_hash.startswith('$2')
+
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Legacy Werkzeug hashes verify through Werkzeug; the login
+        # view re-hashes them with bcrypt on success
+        if self.has_legacy_hash():
+            return check_password_hash(self.password_hash, password)
+        return bcrypt.check_password_hash(self.password_hash, password)
     
     def __repr__(self):
         return f'<User {self.name} - {self.user_type}>'
 
 
-class DiseaseDetection(db.Model):
+class DiseaseDetection(BulkInsertMixin, db.Model):
     __tablename__ = 'disease_detections'
-    
+    # Dashboards filter by user and sort by time on every render
+    __table_args__ = (db.Index('ix_dd_user_time', 'user_id', 'detected_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     image_path = db.Column(db.String(300), nullable=False)
@@ -49,66 +115,155 @@ class DiseaseDetection(db.Model):
     severity = db.Column(db.String(50))
     confidence = db.Column(db.Float)
     location = db.Column(db.String(200))
-    detected_at = db.Column(db.DateTime, default=get_ist_now)
+    detected_at = db.Column(db.DateTime, default=get_ist_now, index=True)
     recommendation = db.Column(db.Text)
     weather_warning = db.Column(db.Text)
-    
+
+    @classmethod
+    def list_summary(cls, user_id=None, limit=None):
+        """
+        Detection listings as plain column tuples, newest first.
+        Listing pages only display scalar columns, so skipping ORM
+        instrumentation avoids identity-map and attribute-history
+        bookkeeping per row. user_id=None returns all users' rows
+        (admin views).
+        """
+        q = db.session.query(
+            cls.id, cls.disease_name, cls.severity, cls.confidence,
+            cls.location, cls.image_path, cls.detected_at
+        )
+        if user_id is not None:
+            q = q.filter_by(user_id=user_id)
+        q = q.order_by(cls.detected_at.desc())
+        if limit is not None:
+            q = q.limit(limit)
+        return q.all()
+
     def __repr__(self):
         return f'<DiseaseDetection {self.disease_name} - {self.detected_at}>'
 
 
-class IrrigationLog(db.Model):
+class IrrigationLog(BulkInsertMixin, db.Model):
     __tablename__ = 'irrigation_logs'
-    
+    __table_args__ = (db.Index('ix_il_user_time', 'user_id', 'logged_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     soil_moisture = db.Column(db.Float)
-    pump_status = db.Column(db.String(10))  # 'ON' or 'OFF'
-    action_type = db.Column(db.String(50))  # 'Manual' or 'Auto'
+    pump_status = db.Column(db.Enum('ON', 'OFF', name='pump_status_enum'))
+    action_type = db.Column(db.Enum('Manual', 'Auto', 'Simulation', name='action_type_enum'))
     message = db.Column(db.Text)
-    logged_at = db.Column(db.DateTime, default=get_ist_now)
-    
+    # Derived at insert time so "dry readings per user" filters and
+    # counts run off an indexed boolean instead of comparing floats
+    # row by row (SQLite has no stored generated columns via ALTER)
+    is_dry = db.Column(db.Boolean, index=True)
+    logged_at = db.Column(db.DateTime, default=get_ist_now, index=True)
+
+    DRY_THRESHOLD = 30.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.is_dry is None and self.soil_moisture is not None:
+            self.is_dry = self.soil_moisture < self.DRY_THRESHOLD
+
+    @classmethod
+    def list_summary(cls, user_id, limit=None):
+        """
+        Log listings as plain column tuples, newest first. As with
+        DiseaseDetection.list_summary, the Row tuples double as
+        immutable, slot-like DTOs for the templates - named attribute
+        access without ORM instrumentation per row.
+        """
+        q = db.session.query(
+            cls.soil_moisture, cls.pump_status, cls.action_type,
+            cls.message, cls.logged_at
+        ).filter_by(user_id=user_id).order_by(cls.logged_at.desc())
+        if limit is not None:
+            q = q.limit(limit)
+        return q.all()
+
     def __repr__(self):
         return f'<IrrigationLog {self.pump_status} - {self.logged_at}>'
 
 
-class MarketPrice(db.Model):
+class MarketPrice(BulkInsertMixin, db.Model):
     __tablename__ = 'market_prices'
-    
+    # One row per source per calendar day; the unique index is the
+    # conflict target for the daily price upsert. The plain day index
+    # keeps the freshness check a range scan.
+    __table_args__ = (
+        db.Index('ix_mp_source_day', 'source', 'day', unique=True),
+        db.Index('ix_market_prices_day', 'day'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     source = db.Column(db.String(100))  # 'CAMPCO Mangalore', 'Local Mandi', etc.
     red_arecanut_price = db.Column(db.Float)
     white_arecanut_price = db.Column(db.Float)
     grade = db.Column(db.String(50))
-    date = db.Column(db.DateTime, default=get_ist_now)
+    date = db.Column(db.DateTime, default=get_ist_now, index=True)
+    day = db.Column(db.Date, default=lambda: get_ist_now().date())
     
     def __repr__(self):
         return f'<MarketPrice {self.source} - {self.date}>'
 
 
-class PumpStatus(db.Model):
-    __tablename__ = 'pump_status'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    status = db.Column(db.String(10), default='OFF')  # 'ON' or 'OFF'
-    updated_at = db.Column(db.DateTime, default=get_ist_now, onupdate=get_ist_now)
-    
-    def __repr__(self):
-        return f'<PumpStatus {self.status}>'
-
-
 class SystemSettings(db.Model):
     __tablename__ = 'system_settings'
-    
+    # The admin settings page filters by category
+    __table_args__ = (db.Index('ix_settings_category', 'category'),)
+
     id = db.Column(db.Integer, primary_key=True)
     setting_key = db.Column(db.String(100), unique=True, nullable=False)
     setting_value = db.Column(db.Text)
-    setting_type = db.Column(db.String(50))  # 'text', 'number', 'boolean', 'json'
-    category = db.Column(db.String(100))  # 'general', 'detection', 'irrigation', 'notifications'
+    setting_type = db.Column(db.Enum('text', 'number', 'boolean', 'json', name='setting_type_enum'))
+    category = db.Column(db.Enum('general', 'detection', 'irrigation', 'notifications', name='setting_category_enum'))
     description = db.Column(db.Text)
     updated_at = db.Column(db.DateTime, default=get_ist_now, onupdate=get_ist_now)
     updated_by = db.Column(db.String(100))
-    
+
+    # Read-mostly config: the whole table is cached per process for
+    # CACHE_TTL seconds so flag checks don't hit SQL on every request.
+    # Write paths call invalidate_cache() after committing.
+    CACHE_TTL = 60
+    _cache = {}
+    _cache_ts = 0.0
+
+    @classmethod
+    def get(cls, key, default=None):
+        """Return the setting_value for key from the in-process cache."""
+        now = time.time()
+        if now - cls._cache_ts > cls.CACHE_TTL:
+            cls._cache = {s.setting_key: s.setting_value for s in cls.query.all()}
+            cls._cache_ts = now
+        return cls._cache.get(key, default)
+
+    @classmethod
+    def invalidate_cache(cls):
+        cls._cache_ts = 0.0
+
+    @property
+    def parsed_value(self):
+        """
+        setting_value coerced per setting_type - json decoded, numbers
+        and booleans converted, text passed through. The decode result
+        is memoized on the instance against the raw string so repeated
+        reads of a json setting parse it once.
+        """
+        raw = self.setting_value
+        cached = getattr(self, '_parsed', None)
+        if cached is not None and cached[0] == raw:
+            return cached[1]
+        if self.setting_type == 'json':
+            value = json.loads(raw) if raw else None
+        elif self.setting_type == 'number':
+            value = float(raw)
+        elif self.setting_type == 'boolean':
+            value = raw == 'true'
+        else:
+            value = raw
+        self._parsed = (raw, value)
+        return value
+
     def __repr__(self):
         return f'<SystemSettings {self.setting_key}={self.setting_value}>'
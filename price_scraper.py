@@ -1,21 +1,73 @@
 """Price scraper module for fetching market prices."""
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Scrape results barely change within a day; hold them for 15 minutes
+# so page loads don't re-trigger a fetch once real scraping is wired in
+_SCRAPE_TTL = 900
+_scrape_cache = {'at': 0.0, 'data': None}
+
+# Static price tables built once at import; the accessor functions hand
+# out shallow copies because callers annotate the dict in place (e.g.
+# update_market_prices tags a 'source' key on fallback).
+_MANGALORE_PRICES = {
+    'red_arecanut_price': 150,
+    'white_arecanut_price': 160,
+    'kokum_price': 120,
+    'coconut_price': 25,
+    'banana_price': 40,
+}
+
+_FALLBACK_PRICES = {
+    'red_arecanut_price': 145,
+    'white_arecanut_price': 155,
+    'kokum_price': 115,
+    'coconut_price': 23,
+    'banana_price': 38,
+}
+
 def scrape_mangalore_prices():
-    """Scrape prices from Mangalore market."""
-    return {
-        'red_arecanut_price': 150,
-        'white_arecanut_price': 160,
-        'kokum_price': 120,
-        'coconut_price': 25,
-        'banana_price': 40,
-    }
+    """Scrape prices from Mangalore market (cached for _SCRAPE_TTL seconds)."""
+    now = time.monotonic()
+    if _scrape_cache['data'] is None or now - _scrape_cache['at'] >= _SCRAPE_TTL:
+        _scrape_cache['data'] = _scrape_mangalore_prices()
+        _scrape_cache['at'] = now
+    return dict(_scrape_cache['data'])
+
+def _fetch_arecanut_prices():
+    """Fetch red/white arecanut prices (static until the source is wired)."""
+    return {k: _MANGALORE_PRICES[k] for k in ('red_arecanut_price', 'white_arecanut_price')}
+
+def _fetch_kokum_price():
+    return {'kokum_price': _MANGALORE_PRICES['kokum_price']}
+
+def _fetch_coconut_price():
+    return {'coconut_price': _MANGALORE_PRICES['coconut_price']}
+
+def _fetch_banana_price():
+    return {'banana_price': _MANGALORE_PRICES['banana_price']}
+
+_SOURCE_FETCHERS = (
+    _fetch_arecanut_prices,
+    _fetch_kokum_price,
+    _fetch_coconut_price,
+    _fetch_banana_price,
+)
+
+def _scrape_mangalore_prices():
+    """
+    Run all source fetchers concurrently and merge their results.
+    Each commodity comes from a different page, so once real HTTP
+    fetchers replace the stubs, wall time is the slowest fetch rather
+    than the sum of all of them.
+    """
+    merged = {}
+    with ThreadPoolExecutor(max_workers=len(_SOURCE_FETCHERS)) as pool:
+        for result in pool.map(lambda fetch: fetch(), _SOURCE_FETCHERS):
+            merged.update(result)
+    return merged
 
 def get_fallback_prices():
     """Get fallback prices when scraping fails."""
-    return {
-        'red_arecanut_price': 145,
-        'white_arecanut_price': 155,
-        'kokum_price': 115,
-        'coconut_price': 23,
-        'banana_price': 38,
-    }
+    return dict(_FALLBACK_PRICES)